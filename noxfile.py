@@ -13,7 +13,7 @@ nox.options.sessions = ["lint", "type_check", "test"]
 
 @session(python=["3.8", "3.9", "3.10", "3.11", "3.12"])
 def test(s: Session) -> None:
-    s.install(".", "pytest", "pytest-cov")
+    s.install(".", "dulwich", "pytest", "pytest-cov")
     s.run(
         "python",
         "-m",
@@ -2,7 +2,9 @@ import datetime
 import os
 import platform
 import re
+import shutil
 import stat
+import subprocess
 import tarfile
 from contextlib import contextmanager
 from pathlib import Path
@@ -14,6 +16,7 @@ from typing import (
     List,
     NoReturn,
     Optional,
+    Set,
     Tuple,
 )
 
@@ -59,6 +62,29 @@ def eprint(*args: Any, **kwargs: Any) -> None:
     _print_verbosity(VERBOSITY_ERROR, *args, **kwargs)
 
 
+class BufferedPrinter:
+    """print lines at a given verbosity in batches rather than one by one.
+
+    Call ``flush()`` before other output to preserve ordering.
+    """
+
+    def __init__(self, verbosity: int, batch_size: int = 256) -> None:
+        self.enabled = verbosity <= _max_verbosity
+        self._batch_size = batch_size
+        self._lines: List[str] = []
+
+    def print(self, line: str) -> None:
+        if self.enabled:
+            self._lines.append(line)
+            if len(self._lines) >= self._batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        if self._lines:
+            print("\n".join(self._lines), flush=True)
+            self._lines.clear()
+
+
 def abort(*args: Any, **kwargs: Any) -> NoReturn:
     eprint(*args, **kwargs)
     raise romt.error.AbortError()
@@ -114,6 +140,49 @@ def chmod_executable(path: Path) -> None:
     os.chmod(str(path), path.stat().st_mode | x_bits)
 
 
+def link_or_copy(src: str, dst: str) -> str:
+    """hardlink src to dst, falling back to a copy if linking fails."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+
+def replace_linked(src: Path, dst: Path) -> None:
+    """replace dst with a hardlink to (or copy of) src.
+
+    dst is removed first so that a previous hardlink is never written
+    through.
+    """
+    if dst.is_file():
+        dst.unlink()
+    link_or_copy(str(src), str(dst))
+
+
+def copytree_linked(src: Path, dst: Path) -> None:
+    """copy tree src to dst, hardlinking files where possible."""
+    shutil.copytree(str(src), str(dst), copy_function=link_or_copy)
+
+
+def entry_names(parent: Path) -> List[str]:
+    """list of names of all entries in parent (empty if parent missing)."""
+    try:
+        with os.scandir(parent) as it:
+            return [entry.name for entry in it]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def file_names(parent: Path) -> Set[str]:
+    """set of names of regular files in parent (empty if parent missing)."""
+    try:
+        with os.scandir(parent) as it:
+            return {entry.name for entry in it if entry.is_file()}
+    except (FileNotFoundError, NotADirectoryError):
+        return set()
+
+
 def gen_dirs(parent: Path) -> Generator[Path, None, None]:
     """generate Path for each dir in parent."""
     for candidate in parent.glob("*"):
@@ -121,12 +190,32 @@ def gen_dirs(parent: Path) -> Generator[Path, None, None]:
             yield candidate
 
 
+def any_dir_nonempty(parent: Path) -> bool:
+    """True if any dir in parent contains at least one entry."""
+    if not parent.is_dir():
+        return False
+    with os.scandir(parent) as it:
+        for entry in it:
+            if entry.is_dir():
+                with os.scandir(entry.path) as sub_it:
+                    if next(sub_it, None) is not None:
+                        return True
+    return False
+
+
 def reversed_date_dir_names(parent: Path) -> List[str]:
     """list of yyyy-mm-dd dirnames in parent (newest to oldest)."""
-    dirs = sorted(
-        (d.name for d in gen_dirs(parent) if is_date(d.name)),
-        reverse=True,
-    )
+    # Check the (cheap) name before the (possibly stat-based) dir test.
+    try:
+        with os.scandir(parent) as it:
+            dirs = [
+                entry.name
+                for entry in it
+                if is_date(entry.name) and entry.is_dir()
+            ]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+    dirs.sort(reverse=True)
     return dirs
 
 
@@ -185,6 +274,43 @@ def normalize_patterns(patterns: Iterable[str]) -> List[str]:
     return norm_patterns
 
 
+def tar_add_file(tar_f: tarfile.TarFile, path: Path, packed_name: str) -> None:
+    """add regular file path to tar_f as packed_name.
+
+    Unlike ``tar_f.add()``, this uses a single ``fstat()`` and skips owner
+    lookups.
+    """
+    with path.open("rb") as f:
+        st = os.fstat(f.fileno())
+        tar_info = tarfile.TarInfo(packed_name)
+        tar_info.size = st.st_size
+        tar_info.mtime = int(st.st_mtime)
+        tar_info.mode = stat.S_IMODE(st.st_mode)
+        tar_f.addfile(tar_info, f)
+
+
+def tar_extract_replacing(
+    tar_f: tarfile.TarFile, tar_info: tarfile.TarInfo, dest_path: Path
+) -> None:
+    """extract tar_info below dest_path, replacing any existing file.
+
+    ``tarfile`` rewrites an existing regular file in place, which would write
+    through hardlinks made by ``fixup``; unlink it first instead.  Member
+    attributes (mode, mtime) are not applied.
+    """
+    # Apply the data filter before unlinking anything it would reject.
+    filtered_info = tarfile.data_filter(tar_info, str(dest_path))
+    try:
+        (dest_path / filtered_info.name).unlink()
+    except FileNotFoundError:
+        pass
+    tar_f.extract(tar_info, str(dest_path), set_attrs=False)
+
+
+# Buffer size for copying archive members (tarfile defaults to 16 KiB).
+TAR_COPY_BUFSIZE = 1024 * 1024
+
+
 @contextmanager
 def tar_context(
     archive_path: Path, mode: str
@@ -199,6 +325,7 @@ def tar_context(
             archive_path.unlink()
         tmp_archive_path = tmp_path_for(archive_path)
         tar_f = tarfile.open(str(tmp_archive_path), mode)
+        tar_f.copybufsize = TAR_COPY_BUFSIZE
         try:
             yield tar_f
         except (Exception, KeyboardInterrupt):
@@ -210,6 +337,77 @@ def tar_context(
         tmp_archive_path.rename(archive_path)
     else:
         tar_f = tarfile.open(str(archive_path), mode)
+        tar_f.copybufsize = TAR_COPY_BUFSIZE
         tar_f.extraction_filter = tarfile.data_filter
         yield tar_f
         tar_f.close()
+
+
+@contextmanager
+def parallel_tar_context(
+    archive_path: Path, mode: str
+) -> Generator[tarfile.TarFile, None, None]:
+    """like tar_context(), but (de)compress ".gz" via ``pigz`` if found.
+
+    The archive is streamed through the ``pigz`` process, so the returned
+    TarFile supports only sequential access (extracting members while
+    iterating when reading, ``addfile()`` when writing).
+    """
+    pigz = shutil.which("pigz")
+    if pigz is None or not archive_path.name.endswith(".gz"):
+        with tar_context(archive_path, mode) as tar_f:
+            yield tar_f
+        return
+
+    if mode == "w":
+        if archive_path.exists():
+            archive_path.unlink()
+        tmp_archive_path = tmp_path_for(archive_path)
+        with tmp_archive_path.open("wb") as out_f:
+            proc = subprocess.Popen(
+                [pigz, "-c"], stdin=subprocess.PIPE, stdout=out_f
+            )
+        assert proc.stdin is not None
+        tar_f = tarfile.open(fileobj=proc.stdin, mode="w|")
+        # Avoid type hint warning about undeclared ``copybufsize`` by
+        # using setattr() to set the attribute.
+        setattr(tar_f, "copybufsize", TAR_COPY_BUFSIZE)
+        try:
+            yield tar_f
+            tar_f.close()
+            proc.stdin.close()
+        except (Exception, KeyboardInterrupt) as e:
+            # Close ``tar_f`` before the pipe so that its stream is not later
+            # flushed into a closed pipe.
+            for f in (tar_f, proc.stdin):
+                try:
+                    f.close()
+                except OSError:
+                    pass
+            returncode = proc.wait()
+            if tmp_archive_path.is_file():
+                tmp_archive_path.unlink()
+            # Writes fail (e.g., ``BrokenPipeError``) when ``pigz`` dies.
+            if isinstance(e, OSError) and returncode != 0:
+                abort(f"{pigz} failed compressing {archive_path}")
+            raise
+        if proc.wait() != 0:
+            tmp_archive_path.unlink()
+            abort(f"{pigz} failed compressing {archive_path}")
+        tmp_archive_path.rename(archive_path)
+    else:
+        proc = subprocess.Popen(
+            [pigz, "-dc", str(archive_path)], stdout=subprocess.PIPE
+        )
+        assert proc.stdout is not None
+        try:
+            tar_f = tarfile.open(fileobj=proc.stdout, mode="r|")
+            setattr(tar_f, "copybufsize", TAR_COPY_BUFSIZE)
+            tar_f.extraction_filter = tarfile.data_filter
+            yield tar_f
+            tar_f.close()
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+        if returncode != 0:
+            abort(f"{pigz} failed decompressing {archive_path}")
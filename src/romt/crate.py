@@ -1,5 +1,6 @@
 import argparse
 import enum
+import functools
 import json
 import os
 import re
@@ -169,23 +170,27 @@ def _prevent_mixed_with_case_insensitive(crates_root_path: Path) -> None:
             raise error.AbortError
 
 
+_CRATE_REL_PATH_RE = re.compile(
+    r"""
+    /
+    (?P<name> [^/]+)
+    /
+    (?P=name) - (?P<version> [^/]+) \.crate
+    $
+    """,
+    re.VERBOSE,
+)
+
+
 def crate_name_version_from_rel_path(rel_path: str) -> Tuple[str, str]:
-    m = re.search(
-        r"""
-        /
-        (?P<name> [^/]+)
-        /
-        (?P=name) - (?P<version> [^/]+) \.crate
-        $
-        """,
-        rel_path,
-        re.VERBOSE,
-    )
+    m = _CRATE_REL_PATH_RE.search(rel_path)
     if m:
         return m.group("name"), m.group("version")
     return "", ""
 
 
+# Crate names recur across index walks, downloads and served requests.
+@functools.lru_cache(maxsize=65536)
 def crate_prefix_from_name(name: str, prefix_style: PrefixStyle) -> str:
     if len(name) == 1:
         prefix = "1"
@@ -276,27 +281,29 @@ def blob_crates(blob: bytes) -> Generator[Crate, None, None]:
         yield crate
 
 
+_INDEX_ENTRY_PATH_RE = re.compile(
+    r"""
+    ^ 1/ [^/] $
+    |
+    ^ 2/ [^/]{2} $
+    |
+    ^ 3/ [^/] / [^/]{3} $
+    |
+    ^ [^/]{2} / [^/]{2} / [^/]{4,} $
+    """,
+    re.VERBOSE,
+)
+
+
 def crates_in_commit_range(
     start_commit: Optional[git.objects.Commit], end_commit: git.objects.Commit
 ) -> Generator[Crate, None, None]:
     """Generate newly specified crates."""
 
-    rex = re.compile(
-        r"""
-        ^ 1/ [^/] $
-        |
-        ^ 2/ [^/]{2} $
-        |
-        ^ 3/ [^/] / [^/]{3} $
-        |
-        ^ [^/]{2} / [^/]{2} / [^/]{4,} $
-        """,
-        re.VERBOSE,
-    )
     for path, start_blob, end_blob in blobs_in_commit_range(
         start_commit, end_commit
     ):
-        if not rex.search(path):
+        if not _INDEX_ENTRY_PATH_RE.search(path):
             continue
         old_versions = {crate.version for crate in blob_crates(start_blob)}
         for crate in blob_crates(end_blob):
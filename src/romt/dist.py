@@ -1,7 +1,7 @@
 import argparse
 import urllib.parse
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from romt import base, common, error
 
@@ -17,8 +17,7 @@ def expand_target_alias(target: str) -> str:
 
 
 def target_exe_suffix(target: str) -> str:
-    parts = target.split("-")
-    if "windows" in parts:
+    if "windows" in target.split("-"):
         suffix = ".exe"
     else:
         suffix = ""
@@ -56,6 +55,9 @@ class DistMain(base.BaseMain):
         super().__init__(args)
         self._specs: Optional[List[str]] = None
         self._targets: Optional[List[str]] = None
+        # rel_paths repeat across commands and hash/sig variants.
+        self._dest_path_cache: Dict[str, Path] = {}
+        self._url_cache: Dict[str, str] = {}
 
     @property
     def specs(self) -> List[str]:
@@ -87,10 +89,18 @@ class DistMain(base.BaseMain):
         return Path(self.args.dest)
 
     def dest_path_from_rel_path(self, rel_path: str) -> Path:
-        return self.dest_path / rel_path
+        path = self._dest_path_cache.get(rel_path)
+        if path is None:
+            path = self.dest_path / rel_path
+            self._dest_path_cache[rel_path] = path
+        return path
 
     def url_from_rel_path(self, rel_path: str) -> str:
-        base_url = self.args.url
-        if not base_url.endswith("/"):
-            base_url += "/"
-        return str(urllib.parse.urljoin(base_url, rel_path))
+        url = self._url_cache.get(rel_path)
+        if url is None:
+            base_url = self.args.url
+            if not base_url.endswith("/"):
+                base_url += "/"
+            url = str(urllib.parse.urljoin(base_url, rel_path))
+            self._url_cache[rel_path] = url
+        return url
@@ -1,11 +1,14 @@
 import functools
+import importlib.util
 import shutil
+import sys
 from pathlib import Path
 from typing import (
     Any,
     Awaitable,
     BinaryIO,
     Callable,
+    Optional,
 )
 
 import httpx
@@ -13,11 +16,36 @@ import trio
 
 from romt import common, error, integrity, signature
 
+if sys.version_info < (3, 11):
+    # Installed by ``trio`` for Python < 3.11.
+    from exceptiongroup import BaseExceptionGroup
+
+
+def _first_error(group: BaseExceptionGroup) -> Optional[error.Error]:
+    for e in group.exceptions:
+        if isinstance(e, BaseExceptionGroup):
+            nested_error = _first_error(e)
+            if nested_error is not None:
+                return nested_error
+        elif isinstance(e, error.Error):
+            return e
+    return None
+
 
 class Downloader:
     def __init__(self, num_jobs: int, timeout_seconds: int) -> None:
         timeout = timeout_seconds if timeout_seconds > 0 else None
-        self._client = httpx.AsyncClient(timeout=timeout)
+        # Keep enough idle connections alive for every job to reuse one.
+        limits = httpx.Limits(
+            max_keepalive_connections=max(num_jobs, 20),
+            max_connections=max(num_jobs, 100),
+        )
+        # Multiplex requests over HTTP/2 when the optional ``h2`` package
+        # (``pip install httpx[http2]``) is installed.
+        http2 = importlib.util.find_spec("h2") is not None
+        self._client = httpx.AsyncClient(
+            timeout=timeout, limits=limits, http2=http2
+        )
         self.sig_verifier = signature.Verifier()
         self._warn_signature = False
         self.num_jobs = num_jobs
@@ -120,6 +148,15 @@ class Downloader:
             sig_path = signature.path_append_sig_suffix(path)
             self._sig_verify(path, sig_path)
 
+    # Hashing large artifacts is CPU-bound; ``hashlib`` releases the GIL, so
+    # verifying in a worker thread keeps other downloads progressing and lets
+    # concurrent jobs hash on separate cores.
+    async def _averify_hash(self, path: Path, hash: str) -> None:
+        await trio.to_thread.run_sync(integrity.verify_hash, path, hash)
+
+    async def _averify(self, path: Path, hash_path: Path) -> None:
+        await trio.to_thread.run_sync(integrity.verify, path, hash_path)
+
     async def adownload_verify_hash(
         self,
         dest_url: str,
@@ -134,14 +171,14 @@ class Downloader:
                 common.vvprint(f"[assuming OK] {dest_path}")
                 return
             try:
-                integrity.verify_hash(dest_path, hash)
+                await self._averify_hash(dest_path, hash)
                 common.vprint(f"[cached file] {dest_path}")
                 return
             except (error.MissingFileError, error.IntegrityError):
                 pass
         common.vprint(f"[downloading] {dest_path}")
         await self.adownload(dest_url, dest_path)
-        integrity.verify_hash(dest_path, hash)
+        await self._averify_hash(dest_path, hash)
 
     def download_verify_hash(
         self,
@@ -182,7 +219,7 @@ class Downloader:
                 common.vvprint(f"[assuming OK] {dest_path}")
                 return
             try:
-                integrity.verify(dest_path, hash_path)
+                await self._averify(dest_path, hash_path)
                 if with_sig:
                     self._sig_verify(dest_path, sig_path)
                 common.vprint(f"[cached file] {dest_path}")
@@ -202,13 +239,13 @@ class Downloader:
         download_required = True
         if dest_path.is_file():
             try:
-                integrity.verify(dest_path, hash_path)
+                await self._averify(dest_path, hash_path)
                 download_required = False
             except (error.MissingFileError, error.IntegrityError):
                 pass
         if download_required:
             await self.adownload(dest_url, dest_path)
-            integrity.verify(dest_path, hash_path)
+            await self._averify(dest_path, hash_path)
 
         if with_sig:
             self._sig_verify(dest_path, sig_path)
@@ -234,7 +271,15 @@ class Downloader:
     def run_job(
         self, job: Callable[..., Awaitable[None]], *args: Any, **kwargs: Any
     ) -> None:
-        trio.run(functools.partial(job, **kwargs), *args)
+        try:
+            trio.run(functools.partial(job, **kwargs), *args)
+        except BaseExceptionGroup as e:
+            # Concurrent tasks may fail together; report the first failure
+            # like a serial run would instead of the whole exception group.
+            first_error = _first_error(e)
+            if first_error is None:
+                raise
+            raise first_error from e
 
     def new_limiter(self) -> trio.CapacityLimiter:
         return trio.CapacityLimiter(self.num_jobs)
@@ -34,7 +34,8 @@ def hash_file(path: Path) -> str:
 def parse_hash_text(hash_text: str) -> str:
     # Expected format: text with lines:
     #   <sha256>  filename
-    return hash_text.split()[0]
+    # Only the leading hash is needed; don't split the remainder.
+    return hash_text.split(None, 1)[0]
 
 
 def read_hash_file(path: Path) -> str:
@@ -150,6 +150,14 @@ class Manifest:
         targets.discard("*")
         return sorted(targets)
 
+    def has_target(self, target: str) -> bool:
+        if target == "*":
+            return False
+        return any(
+            target in package_dict["target"]
+            for package_dict in self._dict["pkg"].values()
+        )
+
     def available_targets(
         self,
         *,
@@ -1,14 +1,21 @@
 import argparse
 import os
 import shutil
+import sys
 from pathlib import Path
 from typing import (
+    Dict,
     List,
     Set,
     Tuple,
 )
 
-import toml
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+import trio
 
 from romt import base, common, dist, error, integrity
 
@@ -90,6 +97,8 @@ ALL_KNOWN_TARGETS = """
     x86_64-unknown-netbsd
     """.split()
 
+ALL_KNOWN_TARGETS_SET = frozenset(ALL_KNOWN_TARGETS)
+
 
 def validate_spec(spec: str) -> str:
     """parse spec into (date, channel).
@@ -175,6 +184,12 @@ def add_arguments(parser: argparse.ArgumentParser) -> None:
 class Main(dist.DistMain):
     def __init__(self, args: argparse.Namespace) -> None:
         super().__init__(args)
+        # Map release-stable path to ((ino, mtime_ns, size), version).
+        self._release_stable_cache: Dict[
+            Path, Tuple[Tuple[int, int, int], str]
+        ] = {}
+        # Map scanned directory path to sorted entry names.
+        self._dir_cache: Dict[Path, List[str]] = {}
 
     @property
     def release_stable_url_path(self) -> Tuple[str, Path]:
@@ -194,15 +209,24 @@ class Main(dist.DistMain):
             # This file changes unexpectedly.  Avoid caching to ensure the
             # correct version is used.
             self.downloader.download_cached(url, path, cached=False)
+            self._release_stable_cache.pop(path, None)
         elif path.is_file():
             common.vprint(f"[read] {path}")
         else:
             raise error.MissingFileError(str(path))
-        return str(toml.load(path)["version"])
-
-    @property
-    def artifact_root_rel_path(self) -> str:
-        return "archive"
+        # Replacements are renamed or extracted into place as a new inode,
+        # which catches same-size rewrites within one mtime tick.
+        st = path.stat()
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        cached = self._release_stable_cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        with path.open("rb") as f:
+            version = str(tomllib.load(f)["version"])
+        self._release_stable_cache[path] = (stamp, version)
+        return version
+
+    artifact_root_rel_path = "archive"
 
     @property
     def artifact_root_path(self) -> Path:
@@ -218,11 +242,9 @@ class Main(dist.DistMain):
 
     def rustup_init_rel_path(self, version: str, target: str) -> str:
         # archive/<version>/<target>/rustup-init[.exe]
-        base_rel_path = "{}/{}/rustup-init".format(
-            self.artifact_version_rel_path(version), target
-        )
-        rel_path = dist.append_exe_suffix(base_rel_path, target)
-        return rel_path
+        root = self.artifact_root_rel_path
+        suffix = dist.target_exe_suffix(target)
+        return f"{root}/{version}/{target}/rustup-init{suffix}"
 
     def version_from_spec(self, spec: str, *, download: bool) -> str:
         if spec == "stable":
@@ -230,9 +252,17 @@ class Main(dist.DistMain):
         else:
             return spec
 
+    def forget_downloaded(self) -> None:
+        """discard cached scans of downloaded versions and targets."""
+        self._dir_cache.clear()
+
     def downloaded_versions(self) -> List[str]:
-        versions = [p.name for p in self.artifact_root_path.glob("*")]
-        return common.reverse_sorted_versions(versions)
+        path = self.artifact_root_path
+        versions = self._dir_cache.get(path)
+        if versions is None:
+            versions = common.reverse_sorted_versions(common.entry_names(path))
+            self._dir_cache[path] = versions
+        return list(versions)
 
     def adjust_download_specs(self, specs: List[str]) -> List[str]:
         # For downloads, wildcards not permitted.
@@ -269,25 +299,71 @@ class Main(dist.DistMain):
         return dist.require_specs(adjusted_specs)
 
     def downloaded_targets(self, version: str) -> List[str]:
-        target_paths = common.gen_dirs(self.artifact_version_path(version))
-        return sorted(t.name for t in target_paths)
+        path = self.artifact_version_path(version)
+        targets = self._dir_cache.get(path)
+        if targets is None:
+            targets = sorted(t.name for t in common.gen_dirs(path))
+            self._dir_cache[path] = targets
+        return list(targets)
 
     def adjust_targets(
         self, version: str, base_targets: List[str]
     ) -> List[str]:
-        targets = set()
-        known_targets = set(ALL_KNOWN_TARGETS)
-        for target in base_targets:
-            if target == "all":
-                targets.update(known_targets)
-            elif target == "*":
-                targets.update(self.downloaded_targets(version))
-            else:
-                if target not in known_targets:
-                    common.eprint(f"warning: unknown target {repr(target)}")
-                targets.add(target)
+        base_target_set = set(base_targets)
+        targets = base_target_set - {"all", "*"}
+        # Warn only about explicitly requested targets, all at once.
+        unknown_targets = sorted(targets - ALL_KNOWN_TARGETS_SET)
+        if "all" in base_target_set:
+            targets.update(ALL_KNOWN_TARGETS_SET)
+        if "*" in base_target_set:
+            targets.update(self.downloaded_targets(version))
+        if unknown_targets:
+            common.eprint(
+                "warning: unknown targets {}".format(
+                    ", ".join(repr(t) for t in unknown_targets)
+                )
+            )
         return sorted(targets)
 
+    async def _download_verify_one(
+        self,
+        limiter: trio.CapacityLimiter,
+        download: bool,
+        dest_url: str,
+        dest_path: Path,
+    ) -> None:
+        try:
+            if download:
+                await self.downloader.adownload_verify(
+                    dest_url, dest_path, assume_ok=self.args.assume_ok
+                )
+            else:
+                # Hash in a worker thread (hashlib releases the GIL) so that
+                # up to ``num_jobs`` verifications overlap.
+                await trio.to_thread.run_sync(
+                    self.downloader.verify, dest_path
+                )
+        finally:
+            limiter.release_on_behalf_of(dest_path)
+
+    async def _download_verify_targets(
+        self, download: bool, version: str, targets: List[str]
+    ) -> None:
+        async with trio.open_nursery() as nursery:
+            limiter = self.downloader.new_limiter()
+            for target in targets:
+                rel_path = self.rustup_init_rel_path(version, target)
+                dest_path = self.dest_path_from_rel_path(rel_path)
+                dest_url = self.url_from_rel_path(rel_path)
+                await limiter.acquire_on_behalf_of(dest_path)
+                nursery.start_soon(
+                    self._download_verify_one,
+                    limiter,
+                    download,
+                    dest_url,
+                    dest_path,
+                )
+
     def _download_verify(
         self, download: bool, specs: List[str], base_targets: List[str]
     ) -> None:
@@ -303,16 +379,9 @@ class Main(dist.DistMain):
             for t in targets:
                 common.vvprint(f"  target: {t}")
 
-            for target in targets:
-                rel_path = self.rustup_init_rel_path(version, target)
-                dest_path = self.dest_path_from_rel_path(rel_path)
-                dest_url = self.url_from_rel_path(rel_path)
-                if download:
-                    self.downloader.download_verify(
-                        dest_url, dest_path, assume_ok=self.args.assume_ok
-                    )
-                else:
-                    self.downloader.verify(dest_path)
+            self.downloader.run_job(
+                self._download_verify_targets, download, version, targets
+            )
 
     def cmd_download(self) -> None:
         specs = self.adjust_download_specs(self.specs)
@@ -320,6 +389,7 @@ class Main(dist.DistMain):
         self._download_verify(
             download=True, specs=specs, base_targets=base_targets
         )
+        self.forget_downloaded()
 
     def cmd_verify(self) -> None:
         specs = self.adjust_wild_specs(self.specs)
@@ -355,52 +425,64 @@ class Main(dist.DistMain):
         base_targets = dist.require_targets(self.targets, default="*")
         archive_path = self.get_archive_path()
         common.iprint(f"Packing archive: {archive_path}")
-        with common.tar_context(archive_path, "w") as tar_f:
-
-            def pack_path(rel_path: str) -> None:
-                dest_path = self.dest_path_from_rel_path(rel_path)
-                packed_name = "rustup/" + rel_path
-                common.vprint(f"[pack] {rel_path}")
-                try:
-                    tar_f.add(str(dest_path), packed_name)
-                except FileNotFoundError:
-                    raise error.MissingFileError(str(dest_path))
-
-            def pack_rel_path(rel_path: str) -> None:
-                pack_path(rel_path)
-                pack_path(integrity.append_hash_suffix(rel_path))
-
-            for spec in self.adjust_wild_specs(self.specs):
-                common.iprint(f"Pack: {spec}")
-                version = self.version_from_spec(spec, download=False)
-                common.iprint(f"  version: {version}")
-
-                targets = self.adjust_targets(version, base_targets)
-                common.iprint(f"  targets: {len(targets)}")
-                for t in targets:
-                    common.vvprint(f"  target: {t}")
-
-                for target in targets:
-                    rel_path = self.rustup_init_rel_path(version, target)
-                    pack_rel_path(rel_path)
+        verbose_printer = common.BufferedPrinter(common.VERBOSITY_VERBOSE)
+        try:
+            with common.tar_context(archive_path, "w") as tar_f:
+
+                def pack_path(rel_path: str) -> None:
+                    dest_path = self.dest_path_from_rel_path(rel_path)
+                    packed_name = "rustup/" + rel_path
+                    verbose_printer.print(f"[pack] {rel_path}")
+                    try:
+                        common.tar_add_file(tar_f, dest_path, packed_name)
+                    except FileNotFoundError:
+                        raise error.MissingFileError(str(dest_path))
+
+                def pack_rel_path(rel_path: str) -> None:
+                    pack_path(rel_path)
+                    pack_path(integrity.append_hash_suffix(rel_path))
+
+                for spec in self.adjust_wild_specs(self.specs):
+                    common.iprint(f"Pack: {spec}")
+                    version = self.version_from_spec(spec, download=False)
+                    common.iprint(f"  version: {version}")
+
+                    targets = self.adjust_targets(version, base_targets)
+                    common.iprint(f"  targets: {len(targets)}")
+                    for t in targets:
+                        common.vvprint(f"  target: {t}")
+
+                    for target in targets:
+                        rel_path = self.rustup_init_rel_path(version, target)
+                        pack_rel_path(rel_path)
+                    verbose_printer.flush()
+        finally:
+            verbose_printer.flush()
 
     def _detect_version_targets(
         self, rel_paths: Set[str]
     ) -> Tuple[List[str], List[str]]:
         # rel_paths should be: "archive/<version>/<target>/<file>".
-        versions = set()
-        targets = set()
+        # Many paths share each (version, target) pair, so collect the
+        # unique pairs first and validate each version only once.
+        version_targets: Set[Tuple[str, str]] = set()
         for p in rel_paths:
-            parts = p.split("/")
+            parts = p.split("/", 3)
             if len(parts) < 4:
                 common.eprint(f"warning: unexpected path {p}")
             else:
-                version = parts[1]
-                target = parts[2]
-                if common.is_version(version):
-                    versions.add(version)
-                    targets.add(target)
-        return sorted(versions), sorted(targets)
+                version_targets.add((parts[1], parts[2]))
+        valid_versions = {
+            version
+            for version in {version for version, _ in version_targets}
+            if common.is_version(version)
+        }
+        targets = {
+            target
+            for version, target in version_targets
+            if version in valid_versions
+        }
+        return sorted(valid_versions), sorted(targets)
 
     def cmd_unpack(self) -> None:
         archive_path = self.get_archive_path()
@@ -408,19 +490,27 @@ class Main(dist.DistMain):
         rustup_prefix = "rustup/"
         prefix = f"{rustup_prefix}{self.artifact_root_rel_path}/"
         extracted = set()
-        with common.tar_context(archive_path, "r") as tar_f:
-            for tar_info in tar_f:
-                if tar_info.isdir():
-                    continue
-                if not tar_info.name.startswith(prefix):
-                    raise error.UnexpectedArchiveMemberError(tar_info.name)
-
-                rel_path = tar_info.name[len(rustup_prefix) :]
-                dest_path = self.dest_path_from_rel_path(rel_path)
-                tar_info.name = str(dest_path)
-                common.vprint(f"[unpack] {rel_path}")
-                tar_f.extract(tar_info, set_attrs=False)
-                extracted.add(rel_path)
+        verbose_printer = common.BufferedPrinter(common.VERBOSITY_VERBOSE)
+        try:
+            with common.tar_context(archive_path, "r") as tar_f:
+                for tar_info in tar_f:
+                    if tar_info.isdir():
+                        continue
+                    if not tar_info.name.startswith(prefix):
+                        raise error.UnexpectedArchiveMemberError(tar_info.name)
+
+                    # Extract relative to ``self.dest_path`` so that the
+                    # archive's data filter accepts an absolute destination.
+                    rel_path = tar_info.name[len(rustup_prefix) :]
+                    tar_info.name = rel_path
+                    verbose_printer.print(f"[unpack] {rel_path}")
+                    common.tar_extract_replacing(
+                        tar_f, tar_info, self.dest_path
+                    )
+                    extracted.add(rel_path)
+        finally:
+            verbose_printer.flush()
+        self.forget_downloaded()
 
         specs, targets = self._detect_version_targets(extracted)
 
@@ -435,11 +525,14 @@ class Main(dist.DistMain):
         self.specs = specs
         self.targets = targets
 
+    def _release_stable_text(self, version: str) -> str:
+        # `version` has been validated as X.Y.Z, so no TOML quoting is needed.
+        return f'schema-version = "1"\nversion = "{version}"\n'
+
     def _write_release_stable(self, version: str) -> None:
         path = self.release_stable_path
-        toml_dict = {"schema-version": "1", "version": version}
-        with path.open("w") as f:
-            toml.dump(toml_dict, f)
+        self._release_stable_cache.pop(path, None)
+        path.write_text(self._release_stable_text(version))
 
     def _fixup_version(self, version: str) -> None:
         # Write release_stable unless a newer one already exists.
@@ -448,7 +541,10 @@ class Main(dist.DistMain):
             old_version = self.get_release_stable_version(download=False)
             new_key = common.version_sort_key(version)
             old_key = common.version_sort_key(old_version)
-            write = new_key >= old_key
+            write = new_key > old_key or (
+                new_key == old_key
+                and path.read_text() != self._release_stable_text(version)
+            )
         else:
             write = True
         if write:
@@ -463,8 +559,7 @@ class Main(dist.DistMain):
             # Artifacts are arranged as: <version_path>/<target>/<artifact>
             # If no artifacts exist for any targets, claim the version
             # is not present.
-            artifacts = list(version_path.glob("*/*"))
-            if not artifacts:
+            if not common.any_dir_nonempty(version_path):
                 raise error.UsageError(f"version {version} not present")
             self._fixup_version(version)
 
@@ -481,8 +576,11 @@ class Main(dist.DistMain):
         if dist_path.is_dir():
             shutil.rmtree(str(dist_path))
 
+        # Artifacts are replaced (via rename on download, via unlink on
+        # unpack) rather than rewritten in place, so hardlinking (instead of
+        # copying) is safe and avoids duplicate data.
         common.iprint(f"[copytree] {archive_version_path} -> {dist_path}")
-        shutil.copytree(str(archive_version_path), str(dist_path))
+        common.copytree_linked(archive_version_path, dist_path)
 
     def _run(self) -> None:
         valid_commands = [
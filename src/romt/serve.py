@@ -1,8 +1,12 @@
 import argparse
 import http.server
 import os
+import sys
+import typing
+import urllib.parse
+import wsgiref.handlers
 from pathlib import Path
-from typing import Optional
+from typing import IO, Any, Callable, Dict, Optional
 
 import romt.crate
 from romt import common
@@ -13,9 +17,12 @@ Serve Rust artifacts via http.
 
 epilog = """\
 Run a simple HTTP server providing access to mirrored toolchains, rustup, and
-crates.  Includes use of git-http-backend to serve the crates index repository.
+crates.  Includes use of git-http-backend to serve the crates index repository
+(or the ``dulwich`` package, when installed).
 """
 
+WsgiApp = Callable[..., Any]
+
 
 def add_arguments(parser: argparse.ArgumentParser) -> None:
     parser.add_argument(
@@ -75,26 +82,40 @@ class Handler(http.server.CGIHTTPRequestHandler):
     # """
     have_fork = False
 
+    # Set by ``setup_git_cgi()`` to avoid probing for the script per request.
+    _git_cgi_path: Optional[Path] = None
+
+    # Set by ``setup_git_wsgi()`` to serve Git in-process instead of via CGI.
+    _git_wsgi_app: Optional[WsgiApp] = None
+
+    # A new Handler is created per request, so cache at class level.
+    _cached_prefix_style: Optional[romt.crate.PrefixStyle] = None
+
     def _crates_config(self) -> romt.crate.CratesConfig:
-        crates_config = getattr(self, "_cached_crates_config", None)
-        if crates_config is None:
-            crates_config = romt.crate._read_crates_config(Path("crates"))
-            self._cached_crates_config = crates_config
-        return crates_config
+        return romt.crate._read_crates_config(Path("crates"))
+
+    def _crates_prefix_style(self) -> romt.crate.PrefixStyle:
+        prefix_style = Handler._cached_prefix_style
+        if prefix_style is None:
+            prefix_style = romt.crate._crates_config_prefix_style(
+                self._crates_config()
+            )
+            Handler._cached_prefix_style = prefix_style
+        return prefix_style
 
     def _rewrite_path(self) -> None:
         path = self.path
         if path.startswith("/git/"):
-            git_cgi_path = find_git_cgi_path()
+            git_cgi_path = self._git_cgi_path
             if git_cgi_path is not None:
                 path = path.replace("git", git_cgi_path.as_posix(), 1)
         elif path.startswith("/crates/"):
             # /crates/.../<name>/<name>-<version>.crate
             # ->
             # /crates/<prefix>/<name>/<name>-<version>.crate
-            prefix_style = romt.crate._crates_config_prefix_style(
-                self._crates_config()
-            )
+            # The rewrite is deterministic and touches no files; a missing
+            # crate simply yields 404 from the static handler.
+            prefix_style = self._crates_prefix_style()
             parent = os.path.dirname(path)
             name = os.path.basename(parent)
             prefix = romt.crate.crate_prefix_from_name(name, prefix_style)
@@ -108,17 +129,66 @@ class Handler(http.server.CGIHTTPRequestHandler):
             common.iprint(f"Rewrite URL: {self.path} -> {path}")
             self.path = path
 
+    def _git_wsgi_environ(self) -> Dict[str, Any]:
+        path, _, query = self.path.partition("?")
+        environ = {
+            "REQUEST_METHOD": self.command,
+            "SCRIPT_NAME": "/git",
+            "PATH_INFO": urllib.parse.unquote(path[len("/git") :]),
+            "QUERY_STRING": query,
+            "CONTENT_TYPE": self.headers.get("Content-Type", ""),
+            "CONTENT_LENGTH": self.headers.get("Content-Length", ""),
+            "SERVER_NAME": getattr(self.server, "server_name", ""),
+            "SERVER_PORT": str(getattr(self.server, "server_port", "")),
+            "SERVER_PROTOCOL": self.request_version,
+            "REMOTE_ADDR": self.client_address[0],
+        }
+        for key, value in self.headers.items():
+            key = "HTTP_" + key.upper().replace("-", "_")
+            if key not in ("HTTP_CONTENT_TYPE", "HTTP_CONTENT_LENGTH"):
+                environ[key] = value
+        return environ
+
+    def _serve_git_wsgi(self) -> bool:
+        app = self._git_wsgi_app
+        if app is None or not self.path.startswith("/git/"):
+            return False
+        handler = wsgiref.handlers.SimpleHandler(
+            self.rfile,
+            typing.cast(IO[bytes], self.wfile),
+            sys.stderr,
+            self._git_wsgi_environ(),
+            multithread=True,
+            multiprocess=False,
+        )
+        handler.server_software = self.version_string()
+        statuses = []
+
+        def logged_app(environ: Dict[str, Any], start_response: Any) -> Any:
+            def logged_start_response(status: str, *args: Any) -> Any:
+                statuses.append(status)
+                return start_response(status, *args)
+
+            return app(environ, logged_start_response)
+
+        handler.run(logged_app)
+        self.log_request(statuses[-1].split()[0] if statuses else "-")
+        return True
+
     def do_get(self) -> None:
-        self._rewrite_path()
-        super().do_GET()
+        if not self._serve_git_wsgi():
+            self._rewrite_path()
+            super().do_GET()
 
     def do_head(self) -> None:
-        self._rewrite_path()
-        super().do_HEAD()
+        if not self._serve_git_wsgi():
+            self._rewrite_path()
+            super().do_HEAD()
 
     def do_post(self) -> None:
-        self._rewrite_path()
-        super().do_POST()
+        if not self._serve_git_wsgi():
+            self._rewrite_path()
+            super().do_POST()
 
 
 # Work-around for non-compliant do_ALLCAPS functions.
@@ -183,6 +253,48 @@ def setup_git_cgi() -> None:
         else:
             common.eprint("Warning: missing git-http-backend; no Git support")
 
+    Handler._git_cgi_path = find_git_cgi_path()
+
+
+def make_git_wsgi_app(git_root: Path) -> Optional[WsgiApp]:
+    """Read-only WSGI app serving Git repos below git_root (needs dulwich)."""
+    try:
+        import dulwich.server
+        import dulwich.web
+    except ImportError:
+        return None
+
+    # Whether dulwich is typed depends upon the installed version.
+    server: Any = dulwich.server
+    web: Any = dulwich.web
+
+    class Backend(server.FileSystemBackend):  # type: ignore[misc]
+        def open_repository(self, path: str) -> Any:
+            # Repository paths arrive as "/<name>"; keep them below root.
+            return super().open_repository(path.lstrip("/"))
+
+    # Serve read-only like ``git-http-backend`` without ``REMOTE_USER``:
+    # disable every default service except fetching (``git-upload-pack``).
+    # dulwich merges ``handlers`` into its defaults, so map the rest to None.
+    handlers = {
+        service: None
+        for service in server.DEFAULT_HANDLERS
+        if service != b"git-upload-pack"
+    }
+    app: WsgiApp = web.make_wsgi_chain(
+        Backend(str(git_root)), handlers=handlers
+    )
+    return app
+
+
+def setup_git_wsgi() -> bool:
+    app = make_git_wsgi_app(Path("git"))
+    if app is None:
+        return False
+    common.iprint("Serving Git repositories in-process via dulwich")
+    Handler._git_wsgi_app = app
+    return True
+
 
 class Main:
     def __init__(self, args: argparse.Namespace) -> None:
@@ -190,12 +302,15 @@ class Main:
 
     def run(self) -> None:
         common.iprint("server running")
-        setup_git_cgi()
+        if not setup_git_wsgi():
+            setup_git_cgi()
 
         # Avoid type hint warning about missing http.server.test by
         # using getattr() to fetch the function.
         serve_func = getattr(http.server, "test")
 
+        # ``http.server.test()`` defaults to ``ThreadingHTTPServer``, so a
+        # long Git fetch does not block other clients.
         serve_func(
             HandlerClass=Handler, bind=self.args.bind, port=self.args.port
         )
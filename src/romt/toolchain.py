@@ -1,9 +1,11 @@
 import argparse
+import functools
 import os
+import posixpath
 import re
-import shutil
 from pathlib import Path
 from typing import (
+    Collection,
     Dict,
     Iterable,
     List,
@@ -63,7 +65,37 @@ For complete details, try ``romt --readme`` to view README.rst.
 
 TOOLCHAIN_DEFAULT_URL = "https://static.rust-lang.org/dist"
 
+_CHANNEL_REX = r"""
+    (?P<channel>
+        nightly | beta | stable | \* | (?: \d+\.\d+\.\d+ )
+    )
+    """
+
+_DATE_REX = r"""
+    (?P<date>
+        \d\d\d\d-\d\d-\d\d | latest | \*
+    )
+    """
+
+_CHANNEL_DATE_RE = re.compile(
+    rf"{_CHANNEL_REX} (?: - {_DATE_REX})? $", re.VERBOSE
+)
+
+_DATE_RE = re.compile(rf"{_DATE_REX} $", re.VERBOSE)
+
+_DETECT_SPEC_RE = re.compile(
+    r"""
+    (?P<date>\d\d\d\d-\d\d-\d\d)
+    /channel-rust-
+    (?P<channel>nightly|stable|beta)
+    \.toml$
+    """,
+    re.VERBOSE,
+)
+
 
+# Specs are parsed repeatedly while expanding and processing each command.
+@functools.lru_cache(maxsize=1024)
 def parse_spec(spec: str) -> Tuple[str, str]:
     """parse spec into (date, channel).
 
@@ -90,25 +122,13 @@ def parse_spec(spec: str) -> Tuple[str, str]:
     if spec == "*":
         return "*", "*"
 
-    channel_rex = r"""
-        (?P<channel>
-            nightly | beta | stable | \* | (?: \d+\.\d+\.\d+ )
-        )
-        """
-
-    date_rex = r"""
-        (?P<date>
-            \d\d\d\d-\d\d-\d\d | latest | \*
-        )
-        """
-
-    m = re.match(rf"{channel_rex} (?: - {date_rex})? $", spec, re.VERBOSE)
+    m = _CHANNEL_DATE_RE.match(spec)
     if m:
         channel = m.group("channel")
         date = m.group("date") or ""
         return date, channel
 
-    m = re.match(rf"{date_rex} $", spec, re.VERBOSE)
+    m = _DATE_RE.match(spec)
     if m:
         date = m.group("date")
         return date, "*"
@@ -211,6 +231,12 @@ class Main(dist.DistMain):
         self.downloader.set_warn_signature(args.warn_signature)
         self._with_sig = not args.no_signature
         self.cross = args.cross
+        # Map (date, channel) to ((ino, mtime_ns, size), parsed manifest).
+        self._manifest_cache: Dict[
+            Tuple[str, str], Tuple[Tuple[int, int, int], Manifest]
+        ] = {}
+        # Map rel_path of a directory in dest to names of files within.
+        self._downloaded_cache: Dict[str, Set[str]] = {}
 
     def manifest_url_path(self, date: str, channel: str) -> Tuple[str, Path]:
         rel_path = channel_rel_path(date, channel)
@@ -225,23 +251,43 @@ class Main(dist.DistMain):
     def get_manifest(
         self, date: str, channel: str, *, download: bool
     ) -> Manifest:
-        man_url, man_path = self.manifest_url_path(date, channel)
+        man_path = self.manifest_path(date, channel)
         if download:
-            if date:
-                # Dated manifests may always be cached.
-                cached = True
-            else:
-                # Undated manifests should always be re-downloaded.  They
-                # might be newer than what's on disk (either because of the
-                # passage of time or because a fixup operation might overwrite
-                # the undated manifest with old information before a download).
-                cached = False
-            self.downloader.download_verify(
-                man_url, man_path, cached=cached, with_sig=self._with_sig
-            )
+            self.downloader.run_job(self._adownload_manifest, date, channel)
         else:
             self.downloader.verify(man_path, with_sig=self._with_sig)
-        return Manifest.from_toml_path(man_path)
+        return self._load_manifest(date, channel, man_path)
+
+    async def _adownload_manifest(self, date: str, channel: str) -> None:
+        man_url, man_path = self.manifest_url_path(date, channel)
+        if date:
+            # Dated manifests may always be cached.
+            cached = True
+        else:
+            # Undated manifests should always be re-downloaded.  They
+            # might be newer than what's on disk (either because of the
+            # passage of time or because a fixup operation might overwrite
+            # the undated manifest with old information before a download).
+            cached = False
+        await self.downloader.adownload_verify(
+            man_url, man_path, cached=cached, with_sig=self._with_sig
+        )
+        self._manifest_cache.pop((date, channel), None)
+
+    def _load_manifest(
+        self, date: str, channel: str, man_path: Path
+    ) -> Manifest:
+        # Replacements are renamed or extracted into place as a new inode,
+        # which catches same-size rewrites within one mtime tick.
+        st = man_path.stat()
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        key = (date, channel)
+        cached = self._manifest_cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        manifest = Manifest.from_toml_path(man_path)
+        self._manifest_cache[key] = (stamp, manifest)
+        return manifest
 
     def select_manifest(
         self, spec: str, *, download: bool, canonical: bool = False
@@ -260,9 +306,13 @@ class Main(dist.DistMain):
         date_path = self.dest_path / date
         prefix = "channel-rust-"
         suffix = ".toml"
+        min_len = len(prefix) + len(suffix)
         channels = [
-            p.name[len(prefix) : -len(suffix)]
-            for p in date_path.glob(prefix + "*" + suffix)
+            name[len(prefix) : -len(suffix)]
+            for name in common.entry_names(date_path)
+            if len(name) >= min_len
+            and name.startswith(prefix)
+            and name.endswith(suffix)
         ]
         return channels
 
@@ -290,9 +340,11 @@ class Main(dist.DistMain):
                 channels = channel_patterns.intersection(
                     self.channels_in_dest_date(d)
                 )
-                specs.extend(f"{channel}-{d}" for channel in channels)
-                if date == "latest" and specs:
-                    break
+                if channels:
+                    specs.extend(f"{channel}-{d}" for channel in channels)
+                    if date == "latest":
+                        # Dates are newest first; stop at the first match.
+                        break
         else:
             specs.append(spec)
 
@@ -308,9 +360,18 @@ class Main(dist.DistMain):
             adjusted_specs.extend(self.expand_wild_spec(spec))
         return dist.require_specs(adjusted_specs)
 
+    def forget_downloaded(self) -> None:
+        """discard cached checks for downloaded files."""
+        self._downloaded_cache.clear()
+
     def _rel_path_is_downloaded(self, rel_path: str) -> bool:
-        dest_path = self.dest_path_from_rel_path(rel_path)
-        return dest_path.is_file()
+        # List each directory once instead of stat()-ing every file.
+        rel_dir, name = posixpath.split(rel_path)
+        names = self._downloaded_cache.get(rel_dir)
+        if names is None:
+            names = common.file_names(self.dest_path_from_rel_path(rel_dir))
+            self._downloaded_cache[rel_dir] = names
+        return name in names
 
     def downloaded_packages(self, manifest: Manifest) -> List[Package]:
         return list(
@@ -327,14 +388,13 @@ class Main(dist.DistMain):
     def adjust_targets(
         self, manifest: Manifest, base_targets: List[str]
     ) -> List[str]:
-        all_targets = set(manifest.all_targets())
         targets = set()
         for target in base_targets:
             if target == "all":
-                targets.update(all_targets)
+                targets.update(manifest.all_targets())
             elif target == "*":
                 targets.update(self.downloaded_target_types(manifest))
-            elif target not in all_targets:
+            elif not manifest.has_target(target):
                 raise error.UsageError(
                     f"target {repr(target)} not found in manifest"
                 )
@@ -342,10 +402,39 @@ class Main(dist.DistMain):
                 targets.add(target)
         return sorted(targets)
 
+    async def _fetch_manifest_one(
+        self,
+        limiter: trio.CapacityLimiter,
+        date: str,
+        channel: str,
+    ) -> None:
+        try:
+            await self._adownload_manifest(date, channel)
+        finally:
+            limiter.release_on_behalf_of((date, channel))
+
+    async def _fetch_manifests(self, specs: List[str]) -> None:
+        fetched: Set[Tuple[str, str]] = set()
+        async with trio.open_nursery() as nursery:
+            limiter = self.downloader.new_limiter()
+            for spec in specs:
+                common.iprint(f"Fetch manifest: {spec}")
+                date, channel = parse_spec(spec)
+                if (date, channel) in fetched:
+                    continue
+                fetched.add((date, channel))
+                await limiter.acquire_on_behalf_of((date, channel))
+                nursery.start_soon(
+                    self._fetch_manifest_one, limiter, date, channel
+                )
+
     def cmd_fetch_manifest(self) -> None:
-        for spec in self.adjust_download_specs(self.specs):
-            common.iprint(f"Fetch manifest: {spec}")
-            manifest = self.select_manifest(spec, download=True)
+        specs = self.adjust_download_specs(self.specs)
+        self.downloader.run_job(self._fetch_manifests, specs)
+        for spec in specs:
+            date, channel = parse_spec(spec)
+            _, man_path = self.manifest_url_path(date, channel)
+            manifest = self._load_manifest(date, channel, man_path)
             common.iprint(f"  ident: {manifest.ident}")
 
     async def _download_verify_one(
@@ -368,30 +457,30 @@ class Main(dist.DistMain):
         finally:
             limiter.release_on_behalf_of(dest_path)
 
-    def _path_duplicated(
+    def _rel_path_duplicated(
         self,
-        path: Path,
-        processed_paths: Set[Path],
+        rel_path: str,
+        processed_rel_paths: Set[str],
     ) -> bool:
-        if path in processed_paths:
+        if rel_path in processed_rel_paths:
             return True
-        processed_paths.add(path)
+        processed_rel_paths.add(rel_path)
         return False
 
     async def _download_verify_packages(
         self,
         download: bool,
         packages: Iterable[Package],
-        processed_paths: Set[Path],
+        processed_rel_paths: Set[str],
     ) -> None:
         async with trio.open_nursery() as nursery:
             limiter = self.downloader.new_limiter()
             for package in packages:
                 rel_path = package.rel_path
-                dest_path = self.dest_path_from_rel_path(rel_path)
-                if self._path_duplicated(dest_path, processed_paths):
-                    common.vprint(f"[duplicate] {dest_path}")
+                if self._rel_path_duplicated(rel_path, processed_rel_paths):
+                    common.vprint(f"[duplicate] {rel_path}")
                     continue
+                dest_path = self.dest_path_from_rel_path(rel_path)
                 dest_url = self.url_from_rel_path(rel_path)
                 await limiter.acquire_on_behalf_of(dest_path)
                 nursery.start_soon(
@@ -408,24 +497,31 @@ class Main(dist.DistMain):
         *,
         targets: Iterable[str],
     ) -> Set[Package]:
+        target_list = list(targets)
+        if not target_list:
+            return set()
+        target_types = manifest.available_target_types(
+            targets=target_list,
+            rel_path_is_present=self._rel_path_is_downloaded,
+        )
+        cross_targets = {
+            target
+            for target in target_list
+            if target_types[target] == "cross-target"
+        }
+        # Packages for target "*" go with every target, so they are reduced
+        # only when all targets are cross-targets.
+        all_cross = len(cross_targets) == len(set(target_list))
         packages = set()
-        for target in targets:
-            # In most cases, we need all available packages.
-            target_packages = set(
-                manifest.gen_available_packages(targets=[target])
-            )
-            target_types = manifest.available_target_types(
-                targets=[target],
-                rel_path_is_present=self._rel_path_is_downloaded,
-            )
-            if target_types[target] == "cross-target":
-                # Reduce `packages` to only those present.
-                target_packages = {
-                    p
-                    for p in target_packages
-                    if self._rel_path_is_downloaded(p.rel_path)
-                }
-            packages.update(target_packages)
+        for package in manifest.gen_available_packages(targets=target_list):
+            # In most cases, we need all available packages; for a
+            # cross-target, reduce to only those present.
+            if package.target == "*":
+                is_cross = all_cross
+            else:
+                is_cross = package.target in cross_targets
+            if not is_cross or self._rel_path_is_downloaded(package.rel_path):
+                packages.add(package)
         return packages
 
     def _download_verify(
@@ -436,7 +532,7 @@ class Main(dist.DistMain):
         specs: List[str],
         base_targets: List[str],
     ) -> None:
-        processed_paths: Set[Path] = set()
+        processed_rel_paths: Set[str] = set()
         for spec in specs:
             common.iprint(
                 "{}: {}".format("Download" if download else "Verify", spec)
@@ -446,14 +542,16 @@ class Main(dist.DistMain):
             )
             common.iprint(f"  ident: {manifest.ident}")
             targets = self.adjust_targets(manifest, base_targets)
+            packages: Collection[Package]
             if download:
-                packages = set(
-                    manifest.gen_available_packages(targets=targets)
-                )
-                if cross:
-                    # When downloading a cross-target, keep only the
-                    # Rust standard library package.
-                    packages = {p for p in packages if p.name == "rust-std"}
+                # Manifest packages are unique per (name, target), so no
+                # set is needed.  When downloading a cross-target, keep
+                # only the Rust standard library package.
+                packages = [
+                    p
+                    for p in manifest.gen_available_packages(targets=targets)
+                    if not cross or p.name == "rust-std"
+                ]
             else:
                 packages = self.downloaded_target_packages(
                     manifest, targets=targets
@@ -470,8 +568,10 @@ class Main(dist.DistMain):
                 self._download_verify_packages,
                 download,
                 packages,
-                processed_paths,
+                processed_rel_paths,
             )
+            if download:
+                self.forget_downloaded()
 
     def cmd_download(self) -> None:
         specs = self.adjust_download_specs(self.specs)
@@ -540,69 +640,71 @@ class Main(dist.DistMain):
         base_targets = dist.require_targets(self.targets, default="*")
         archive_path = self.get_archive_path()
         common.iprint(f"Packing archive: {archive_path}")
-        with common.tar_context(archive_path, "w") as tar_f:
-            processed_paths: Set[Path] = set()
-
-            def pack_path(rel_path: str) -> None:
-                dest_path = self.dest_path_from_rel_path(rel_path)
-                if self._path_duplicated(dest_path, processed_paths):
-                    common.vprint(f"[duplicate] {rel_path}")
-                    return
-                packed_name = "dist/" + rel_path
-                common.vprint(f"[pack] {rel_path}")
-                try:
-                    tar_f.add(str(dest_path), packed_name)
-                except FileNotFoundError:
-                    raise error.MissingFileError(str(dest_path))
-
-            def pack_rel_path(rel_path: str) -> None:
-                pack_path(rel_path)
-                pack_path(integrity.append_hash_suffix(rel_path))
-                if self._with_sig:
-                    pack_path(signature.append_sig_suffix(rel_path))
-
-            for spec in self.adjust_wild_specs(self.specs):
-                common.iprint(f"Pack: {spec}")
-                manifest = self.select_manifest(
-                    spec, download=False, canonical=True
-                )
-                common.iprint(f"  ident: {manifest.ident}")
-
-                targets = self.adjust_targets(manifest, base_targets)
-                packages = sorted(
-                    self.downloaded_target_packages(manifest, targets=targets),
-                    key=lambda p: (p.target, p.name),
-                )
-                common.iprint(
-                    "  packages: {}, targets: {}".format(
-                        len(packages), len(targets)
+        verbose_printer = common.BufferedPrinter(common.VERBOSITY_VERBOSE)
+        try:
+            with common.parallel_tar_context(archive_path, "w") as tar_f:
+                processed_rel_paths: Set[str] = set()
+
+                def pack_path(rel_path: str) -> None:
+                    if self._rel_path_duplicated(
+                        rel_path, processed_rel_paths
+                    ):
+                        verbose_printer.print(f"[duplicate] {rel_path}")
+                        return
+                    dest_path = self.dest_path_from_rel_path(rel_path)
+                    packed_name = "dist/" + rel_path
+                    verbose_printer.print(f"[pack] {rel_path}")
+                    try:
+                        common.tar_add_file(tar_f, dest_path, packed_name)
+                    except FileNotFoundError:
+                        raise error.MissingFileError(str(dest_path))
+
+                def rel_path_parts(rel_path: str) -> List[str]:
+                    parts = [rel_path, integrity.append_hash_suffix(rel_path)]
+                    if self._with_sig:
+                        parts.append(signature.append_sig_suffix(rel_path))
+                    return parts
+
+                for spec in self.adjust_wild_specs(self.specs):
+                    common.iprint(f"Pack: {spec}")
+                    manifest = self.select_manifest(
+                        spec, download=False, canonical=True
                     )
-                )
-                for t in targets:
-                    common.vvprint(f"  target: {t}")
-
-                # Pack channel file.
-                pack_rel_path(
-                    channel_rel_path(manifest.date, manifest.channel)
-                )
+                    common.iprint(f"  ident: {manifest.ident}")
+
+                    targets = self.adjust_targets(manifest, base_targets)
+                    packages = sorted(
+                        self.downloaded_target_packages(
+                            manifest, targets=targets
+                        ),
+                        key=lambda p: (p.target, p.name),
+                    )
+                    common.iprint(
+                        "  packages: {}, targets: {}".format(
+                            len(packages), len(targets)
+                        )
+                    )
+                    for t in targets:
+                        common.vvprint(f"  target: {t}")
 
-                # Pack up package file parts.
-                for package in packages:
-                    pack_rel_path(package.rel_path)
+                    # Pack channel file and package file parts, grouped by
+                    # directory for sequential reads.
+                    rel_paths = rel_path_parts(
+                        channel_rel_path(manifest.date, manifest.channel)
+                    )
+                    for package in packages:
+                        rel_paths.extend(rel_path_parts(package.rel_path))
+                    rel_paths.sort(key=posixpath.split)
+                    for rel_path in rel_paths:
+                        pack_path(rel_path)
+                    verbose_printer.flush()
+        finally:
+            verbose_printer.flush()
 
     def _detect_specs(self, rel_paths: Set[str]) -> List[str]:
         specs = []
         for rel_path in rel_paths:
-            m = re.match(
-                r"""
-                (?P<date>\d\d\d\d-\d\d-\d\d)
-                /channel-rust-
-                (?P<channel>nightly|stable|beta)
-                \.toml$
-                """,
-                rel_path,
-                re.VERBOSE,
-            )
+            m = _DETECT_SPEC_RE.match(rel_path)
             if m:
                 date = m.group("date")
                 channel = m.group("channel")
@@ -625,20 +727,27 @@ class Main(dist.DistMain):
         archive_path = self.get_archive_path()
         common.iprint(f"Unpacking archive: {archive_path}")
         dist_prefix = "dist/"
-        extracted = set()
-        with common.tar_context(archive_path, "r") as tar_f:
-            for tar_info in tar_f:
-                if tar_info.isdir():
-                    continue
-                if not tar_info.name.startswith(dist_prefix):
-                    raise error.UnexpectedArchiveMemberError(tar_info.name)
-
-                rel_path = tar_info.name[len(dist_prefix) :]
-                dest_path = self.dest_path_from_rel_path(rel_path)
-                tar_info.name = str(dest_path)
-                common.vprint(f"[unpack] {rel_path}")
-                tar_f.extract(tar_info, set_attrs=False)
-                extracted.add(rel_path)
+        extracted: Set[str] = set()
+        verbose_printer = common.BufferedPrinter(common.VERBOSITY_VERBOSE)
+        try:
+            with common.parallel_tar_context(archive_path, "r") as tar_f:
+                for tar_info in tar_f:
+                    if tar_info.isdir():
+                        continue
+                    if not tar_info.name.startswith(dist_prefix):
+                        raise error.UnexpectedArchiveMemberError(tar_info.name)
+
+                    # Members are extracted relative to ``self.dest_path``.
+                    rel_path = tar_info.name[len(dist_prefix) :]
+                    tar_info.name = rel_path
+                    verbose_printer.print(f"[unpack] {rel_path}")
+                    common.tar_extract_replacing(
+                        tar_f, tar_info, self.dest_path
+                    )
+                    extracted.add(rel_path)
+        finally:
+            verbose_printer.flush()
+        self.forget_downloaded()
 
         specs = self._detect_specs(extracted)
         targets = self._detect_targets(specs, extracted)
@@ -660,9 +769,10 @@ class Main(dist.DistMain):
             have_all_targets = True
             detected_targets = set(targets)
             for spec in specs:
+                # ``_detect_targets()`` already parsed (and cached) these.
                 manifest = self.select_manifest(spec, download=False)
                 spec_targets = set(manifest.available_target_types())
-                if spec_targets.intersection(detected_targets) != spec_targets:
+                if not spec_targets <= detected_targets:
                     have_all_targets = False
                     break
             if have_all_targets:
@@ -676,15 +786,43 @@ class Main(dist.DistMain):
     ) -> None:
         src_path = self.manifest_path(manifest.date, manifest.channel)
         dst_path = self.manifest_path(date, channel)
-        common.iprint(f"[publish] {dst_path}")
-        shutil.copyfile(str(src_path), str(dst_path))
-        src_hash_path = integrity.path_append_hash_suffix(src_path)
-        dst_hash_path = integrity.path_append_hash_suffix(dst_path)
-        shutil.copyfile(str(src_hash_path), str(dst_hash_path))
+        src_dst_paths = [
+            (src_path, dst_path),
+            (
+                integrity.path_append_hash_suffix(src_path),
+                integrity.path_append_hash_suffix(dst_path),
+            ),
+        ]
         if self._with_sig:
-            src_sig_path = signature.path_append_sig_suffix(src_path)
-            dst_sig_path = signature.path_append_sig_suffix(dst_path)
-            shutil.copyfile(str(src_sig_path), str(dst_sig_path))
+            src_dst_paths.append(
+                (
+                    signature.path_append_sig_suffix(src_path),
+                    signature.path_append_sig_suffix(dst_path),
+                )
+            )
+        if self._manifest_is_published(src_dst_paths):
+            common.vprint(f"[up-to-date] {dst_path}")
+            return
+        common.iprint(f"[publish] {dst_path}")
+        self._manifest_cache.pop((date, channel), None)
+        # Downloads (via rename) and unpacking (via unlink) always replace
+        # files rather than rewriting them, so hardlinks are safe.
+        for src, dst in src_dst_paths:
+            common.replace_linked(src, dst)
+
+    def _manifest_is_published(
+        self, src_dst_paths: List[Tuple[Path, Path]]
+    ) -> bool:
+        (src_path, dst_path), *small_src_dst_paths = src_dst_paths
+        if not all(dst.is_file() for _, dst in src_dst_paths):
+            return False
+        if src_path.stat().st_size != dst_path.stat().st_size:
+            return False
+        # The (small) hash file identifies the manifest content.
+        return all(
+            src.read_bytes() == dst.read_bytes()
+            for src, dst in small_src_dst_paths
+        )
 
     def _write_manifest_variations(self, manifest: Manifest) -> None:
         date = manifest.date
@@ -1,4 +1,10 @@
-from romt import common
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from romt import common, error
 
 
 def test_is_date() -> None:
@@ -48,3 +54,153 @@ def test_normalize_patterns() -> None:
     assert normalize_patterns(["  c  b,,,a "]) == ["a", "b", "c"]
     assert normalize_patterns(["d,b", "c , a"]) == ["a", "b", "c", "d"]
     assert normalize_patterns(["a,*,b"]) == ["*"]
+
+
+def test_copytree_linked(tmp_path: Path) -> None:
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    (src / "sub" / "file").write_text("data")
+    dst = tmp_path / "dst"
+    common.copytree_linked(src, dst)
+    assert (dst / "sub" / "file").read_text() == "data"
+
+
+def test_reversed_date_dir_names(tmp_path: Path) -> None:
+    for name in ["2020-01-02", "2021-03-04", "2020-11-12", "other"]:
+        (tmp_path / name).mkdir()
+    (tmp_path / "2022-01-01").write_text("not a dir")
+    assert common.reversed_date_dir_names(tmp_path) == [
+        "2021-03-04",
+        "2020-11-12",
+        "2020-01-02",
+    ]
+    assert common.reversed_date_dir_names(tmp_path / "missing") == []
+
+
+def test_file_names(tmp_path: Path) -> None:
+    (tmp_path / "file").write_text("")
+    (tmp_path / "dir").mkdir()
+    assert common.file_names(tmp_path) == {"file"}
+    assert common.file_names(tmp_path / "file") == set()
+    assert common.file_names(tmp_path / "missing") == set()
+
+
+def test_replace_linked(tmp_path: Path) -> None:
+    src1 = tmp_path / "src1"
+    src1.write_text("one")
+    src2 = tmp_path / "src2"
+    src2.write_text("two")
+    dst = tmp_path / "dst"
+    common.replace_linked(src1, dst)
+    assert dst.read_text() == "one"
+    # Replacing dst must not write through a previous hardlink to src1.
+    common.replace_linked(src2, dst)
+    assert dst.read_text() == "two"
+    assert src1.read_text() == "one"
+
+
+def test_any_dir_nonempty(tmp_path: Path) -> None:
+    any_dir_nonempty = common.any_dir_nonempty
+    assert not any_dir_nonempty(tmp_path / "missing")
+    assert not any_dir_nonempty(tmp_path)
+    (tmp_path / "file").write_text("data")
+    (tmp_path / "empty").mkdir()
+    assert not any_dir_nonempty(tmp_path)
+    (tmp_path / "target").mkdir()
+    (tmp_path / "target" / "artifact").write_text("data")
+    assert any_dir_nonempty(tmp_path)
+
+
+def test_tar_add_file(tmp_path: Path) -> None:
+    path = tmp_path / "file"
+    path.write_bytes(b"data")
+    archive_path = tmp_path / "archive.tar"
+    with common.tar_context(archive_path, "w") as tar_f:
+        common.tar_add_file(tar_f, path, "packed/file")
+    with common.tar_context(archive_path, "r") as tar_f:
+        tar_info = tar_f.getmember("packed/file")
+        assert tar_info.isfile()
+        assert tar_info.size == 4
+        f = tar_f.extractfile(tar_info)
+        assert f is not None
+        assert f.read() == b"data"
+
+
+@pytest.mark.skipif(shutil.which("gzip") is None, reason="requires gzip")
+def test_parallel_tar_context(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # ``gzip`` accepts the same ``-c`` and ``-dc`` options as ``pigz``.
+    gzip = shutil.which("gzip")
+    monkeypatch.setattr(shutil, "which", lambda name: gzip)
+    path = tmp_path / "file"
+    path.write_bytes(b"data")
+    archive_path = tmp_path / "archive.tar.gz"
+    with common.parallel_tar_context(archive_path, "w") as tar_f:
+        common.tar_add_file(tar_f, path, "packed/file")
+    with common.tar_context(archive_path, "r") as tar_f:
+        assert tar_f.getnames() == ["packed/file"]
+    dest_path = tmp_path / "dest"
+    with common.parallel_tar_context(archive_path, "r") as tar_f:
+        for tar_info in tar_f:
+            common.tar_extract_replacing(tar_f, tar_info, dest_path)
+    assert (dest_path / "packed/file").read_bytes() == b"data"
+
+
+@pytest.mark.skipif(common.is_windows, reason="requires a shell script")
+def test_parallel_tar_context_pigz_failure(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    pigz_path = tmp_path / "pigz"
+    pigz_path.write_text("#!/bin/sh\nexit 3\n")
+    common.chmod_executable(pigz_path)
+    monkeypatch.setattr(shutil, "which", lambda name: str(pigz_path))
+    # Large enough to overflow the pipe, so writing fails.
+    path = tmp_path / "file"
+    path.write_bytes(bytes(1024 * 1024))
+    archive_path = tmp_path / "archive.tar.gz"
+    with pytest.raises(error.AbortError):
+        with common.parallel_tar_context(archive_path, "w") as tar_f:
+            common.tar_add_file(tar_f, path, "packed/file")
+    assert not archive_path.exists()
+    assert not common.tmp_path_for(archive_path).exists()
+
+
+def test_tar_extract_replacing(tmp_path: Path) -> None:
+    path = tmp_path / "file"
+    path.write_bytes(b"new")
+    os.utime(path, (0, 0))
+    archive_path = tmp_path / "archive.tar"
+    with common.tar_context(archive_path, "w") as tar_f:
+        common.tar_add_file(tar_f, path, "file")
+
+    dest_path = tmp_path / "dest"
+    dest_path.mkdir()
+    dest_file_path = dest_path / "file"
+    dest_file_path.write_bytes(b"old")
+    linked_path = tmp_path / "linked"
+    os.link(dest_file_path, linked_path)
+    with common.tar_context(archive_path, "r") as tar_f:
+        for tar_info in tar_f:
+            common.tar_extract_replacing(tar_f, tar_info, dest_path)
+    assert dest_file_path.read_bytes() == b"new"
+    # The existing file was replaced, not rewritten through the hardlink.
+    assert linked_path.read_bytes() == b"old"
+    # Archive attributes are not applied.
+    assert dest_file_path.stat().st_mtime != 0
+
+
+def test_buffered_printer(capsys: pytest.CaptureFixture[str]) -> None:
+    printer = common.BufferedPrinter(common.VERBOSITY_INFO, batch_size=2)
+    printer.print("a")
+    assert capsys.readouterr().out == ""
+    printer.print("b")
+    assert capsys.readouterr().out == "a\nb\n"
+    printer.print("c")
+    printer.flush()
+    assert capsys.readouterr().out == "c\n"
+
+    quiet_printer = common.BufferedPrinter(common.VERBOSITY_VVERBOSE)
+    quiet_printer.print("a")
+    quiet_printer.flush()
+    assert capsys.readouterr().out == ""
@@ -12,3 +12,7 @@ def test_crate_prefix_from_name() -> None:
     assert romt.crate.crate_prefix_from_name("AbC", mixed) == "3/A"
     assert romt.crate.crate_prefix_from_name("AbCd", lower) == "ab/cd"
     assert romt.crate.crate_prefix_from_name("AbCd", mixed) == "Ab/Cd"
+    # Results are cached, keyed by (name, prefix_style).
+    info = romt.crate.crate_prefix_from_name.cache_info()
+    assert romt.crate.crate_prefix_from_name("AbCd", mixed) == "Ab/Cd"
+    assert romt.crate.crate_prefix_from_name.cache_info().hits == info.hits + 1
@@ -0,0 +1,21 @@
+import pytest
+import trio
+
+from romt import download, error
+
+
+def test_run_job_reports_first_error() -> None:
+    downloader = download.Downloader(num_jobs=2, timeout_seconds=0)
+
+    async def fail(name: str) -> None:
+        raise error.MissingFileError(name)
+
+    async def job() -> None:
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(fail, "a")
+            nursery.start_soon(fail, "b")
+
+    # Concurrent failures surface as one ``error.Error``, not a group.
+    with pytest.raises(error.MissingFileError):
+        downloader.run_job(job)
+    downloader.close()
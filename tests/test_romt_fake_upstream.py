@@ -1,8 +1,7 @@
-import filecmp
 import hashlib
 import json
 import os
-import shutil
+import sys
 import textwrap
 import typing as T
 from pathlib import Path
@@ -14,16 +13,16 @@ import toml
 import romt.cli
 import romt.crate
 
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
 
 def path_append_suffix(path: Path, suffix: str) -> Path:
     return path.with_suffix(path.suffix + suffix)
 
 
-def rmtree(path: Path) -> None:
-    if path.is_dir():
-        shutil.rmtree(path)
-
-
 def mkdir_p(path: Path) -> None:
     if not path.is_dir():
         path.mkdir(parents=True)
@@ -44,15 +43,26 @@ def append_file_line(path: Path, line: str) -> None:
         f.write(line + "\n")
 
 
-def walk_files(root: Path) -> T.Generator[Path, None, None]:
-    for dirpath, dirnames, filenames in os.walk(root):
-        for name in filenames:
-            yield Path(dirpath) / name
+def walk_file_paths(dir_path: str) -> T.Generator[str, None, None]:
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            if entry.is_dir():
+                yield from walk_file_paths(entry.path)
+            else:
+                yield entry.path
 
 
 def walk_files_rel(root: Path) -> T.Generator[str, None, None]:
-    for p in walk_files(root):
-        yield str(p.relative_to(root))
+    root_prefix_len = len(os.path.join(str(root), ""))
+    for path in walk_file_paths(str(root)):
+        yield path[root_prefix_len:]
+
+
+def same_file_contents(left: Path, right: Path) -> bool:
+    # Files differing in size need not be read at all.
+    if left.stat().st_size != right.stat().st_size:
+        return False
+    return left.read_bytes() == right.read_bytes()
 
 
 def assert_same_files(
@@ -67,9 +77,16 @@ def assert_same_files(
     left_only = left - right
     right_only = right - left
 
-    match, mismatch, errors = filecmp.cmpfiles(
-        left_root, right_root, common, shallow=False
-    )
+    mismatch = []
+    errors = []
+    for rel_path in sorted(common):
+        try:
+            if not same_file_contents(
+                left_root / rel_path, right_root / rel_path
+            ):
+                mismatch.append(rel_path)
+        except OSError:
+            errors.append(rel_path)
 
     print(f"{left_only=}")
     print(f"{right_only=}")
@@ -92,12 +109,15 @@ def repo_work_path(repo: git.Repo) -> Path:
     return Path(working_tree_dir)
 
 
+INDEX_CONFIG_JSON = json.dumps(
+    dict(dl="https://crates.io/api/v1/crates", api="https://crates.io"),
+    indent=2,
+)
+
+
 def repo_add_config(repo: git.Repo) -> None:
     config_path = repo_work_path(repo) / "config.json"
-    config = dict(
-        dl="https://crates.io/api/v1/crates", api="https://crates.io"
-    )
-    write_file_text(config_path, json.dumps(config, indent=2))
+    write_file_text(config_path, INDEX_CONFIG_JSON)
     repo.index.add(str(config_path))
     repo.index.commit("add `config.json`")
 
@@ -167,37 +187,74 @@ def make_fake_sha256_file_pair(path: Path) -> str:
     return make_sha256_file_pair(path, data)
 
 
-def make_dist_file(root: Path, url: str) -> str:
+# Create each `path` (containing `data`) and `path.sha256` (containing the
+# precomputed `sha256sum`), making each parent directory only once.
+def make_sha256_file_pairs(
+    files: T.Dict[Path, T.Tuple[bytes, str]],
+) -> None:
+    made_dirs: T.Set[Path] = set()
+    for path, (data, sha256sum) in files.items():
+        if path.parent not in made_dirs:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            made_dirs.add(path.parent)
+        path.write_bytes(data)
+        path_append_suffix(path, ".sha256").write_text(sha256sum + "\n")
+
+
+# Record fake (path, data) for `url` in `files`, returning `sha256sum`.
+# Manifests may reference the same URL more than once; each file is recorded
+# (and later written) only once.
+def add_dist_file(
+    files: T.Dict[Path, T.Tuple[bytes, str]], root: Path, url: str
+) -> str:
     prefix = "https://static.rust-lang.org/"
     assert url.startswith(prefix)
     path = root / url[len(prefix) :]
-    return make_fake_sha256_file_pair(path)
+    if path not in files:
+        data = (path.name + "\n").encode()
+        files[path] = (data, hashlib.sha256(data).hexdigest())
+    return files[path][1]
 
 
-def make_dist(root: Path, manifest: T.Any) -> None:
-    if isinstance(manifest, dict):
+def collect_dist(
+    files: T.Dict[Path, T.Tuple[bytes, str]], root: Path, manifest: T.Any
+) -> None:
+    if type(manifest) is dict:
         url = manifest.get("url")
         if url:
-            manifest["hash"] = make_dist_file(root, url)
+            manifest["hash"] = add_dist_file(files, root, url)
         xz_url = manifest.get("xz_url")
         if xz_url:
-            manifest["xz_hash"] = make_dist_file(root, xz_url)
-        for value in manifest.values():
-            make_dist(root, value)
-    elif isinstance(manifest, list):
-        for value in manifest:
-            make_dist(root, value)
+            manifest["xz_hash"] = add_dist_file(files, root, xz_url)
+        values: T.Iterable[T.Any] = manifest.values()
+    elif type(manifest) is list:
+        values = manifest
+    else:
+        return
+    # Only containers can hold URLs; skip recursing into scalar leaves.
+    for value in values:
+        t = type(value)
+        if t is dict or t is list:
+            collect_dist(files, root, value)
 
 
-@pytest.fixture
-def tests_path(request: pytest.FixtureRequest) -> Path:
-    return Path(request.path).parent
+def make_dist(root: Path, manifest: T.Any) -> None:
+    files: T.Dict[Path, T.Tuple[bytes, str]] = {}
+    collect_dist(files, root, manifest)
+    make_sha256_file_pairs(files)
 
 
-@pytest.fixture
-def upstream_path(tests_path: Path) -> Path:
-    path = Path("fake") / "upstream"
-    rmtree(path)
+@pytest.fixture(scope="session")
+def tests_path() -> Path:
+    return Path(__file__).parent
+
+
+# Tests only read from upstream, so build it once per session.
+@pytest.fixture(scope="session")
+def upstream_path(
+    tests_path: Path, tmp_path_factory: pytest.TempPathFactory
+) -> Path:
+    path = tmp_path_factory.mktemp("upstream")
 
     # Setup upstream crates.
     crates_path = path / "crates"
@@ -209,15 +266,28 @@ def upstream_path(tests_path: Path) -> Path:
         add_crate(repo, crates_path, name, version)
 
     # Setup upstream toolchain.
-    manifest = toml.load(tests_path / "channel-rust-1.76.0.toml")
+    # Parse with the (faster) `tomllib`; `toml` is still needed for writing.
+    with open(tests_path / "channel-rust-1.76.0.toml", "rb") as f:
+        manifest = tomllib.load(f)
     make_dist(path, manifest)
     manifest_bytes = toml.dumps(manifest).encode()
     dist_path = path / "dist"
+    # All four channel manifests have identical content; write and hash the
+    # first, then hardlink the others to it.
+    first_path: T.Optional[Path] = None
     for version in ["1.76.0", "stable"]:
         for p in [dist_path, dist_path / "2024-02-08"]:
-            make_sha256_file_pair(
-                p / f"channel-rust-{version}.toml", manifest_bytes
-            )
+            man_path = p / f"channel-rust-{version}.toml"
+            if first_path is None:
+                make_sha256_file_pair(man_path, manifest_bytes)
+                first_path = man_path
+            else:
+                mkdir_p(man_path.parent)
+                for suffix in ["", ".sha256"]:
+                    os.link(
+                        path_append_suffix(first_path, suffix),
+                        path_append_suffix(man_path, suffix),
+                    )
 
     # Setup upstream `rustup`.
     rustup_path = path / "rustup"
@@ -243,19 +313,13 @@ def upstream_path(tests_path: Path) -> Path:
 
 
 @pytest.fixture
-def inet_path() -> Path:
-    inet_path = Path("fake") / "inet"
-    rmtree(inet_path)
-    mkdir_p(inet_path)
-    return inet_path
+def inet_path(tmp_path: Path) -> Path:
+    return tmp_path / "inet"
 
 
 @pytest.fixture
-def offline_path() -> Path:
-    offline_path = Path("fake") / "offline"
-    rmtree(offline_path)
-    mkdir_p(offline_path)
-    return offline_path
+def offline_path(tmp_path: Path) -> Path:
+    return tmp_path / "offline"
 
 
 def crate_must_run(root_path: Path, args: T.List[str]) -> None:
@@ -333,7 +397,7 @@ def toolchain_must_run(root_path: Path, args: T.List[str]) -> None:
     assert romt.cli.run(toolchain_args + args) == 0
 
 
-toolchain_artifact_names_1_76_0 = set(
+toolchain_artifact_names_1_76_0 = frozenset(
     """
 
     cargo-1.76.0-x86_64-unknown-linux-gnu.tar.xz
@@ -381,12 +445,10 @@ toolchain_artifact_names_1_76_0 = set(
 
 
 def rel_paths_with_base_names(
-    rel_paths: T.Iterable[str], base_names: T.Iterable[str]
+    rel_paths: T.Iterable[str], base_names: T.FrozenSet[str]
 ) -> T.Generator[str, None, None]:
-    names = set(base_names)
-    for p in rel_paths:
-        if os.path.basename(p) in names:
-            yield p
+    # `walk_files_rel()` joins with `os.sep`, so split on it directly.
+    return (p for p in rel_paths if p.rpartition(os.sep)[2] in base_names)
 
 
 def test_toolchain(
@@ -407,7 +469,7 @@ def test_toolchain(
         "--no-signature",
     ]
 
-    artifact_names = set(toolchain_artifact_names_1_76_0)
+    artifact_names = toolchain_artifact_names_1_76_0
 
     toolchain_must_run(
         inet_path,
@@ -452,18 +514,16 @@ def test_toolchain(
         + ["-s", "1.76.0", "-t", cross_target, "--cross", "download", "pack"],
     )
 
-    artifact_names.update(
-        [
-            "rust-std-1.76.0-x86_64-unknown-linux-musl.tar.xz",
-            "rust-std-1.76.0-x86_64-unknown-linux-musl.tar.xz.sha256",
-        ]
-    )
+    cross_artifact_names = artifact_names | {
+        "rust-std-1.76.0-x86_64-unknown-linux-musl.tar.xz",
+        "rust-std-1.76.0-x86_64-unknown-linux-musl.tar.xz.sha256",
+    }
 
     inet_files_rel = set(walk_files_rel(inet_dist_path))
 
     assert_same_files(
         upstream_dist_path,
-        rel_paths_with_base_names(upstream_files_rel, artifact_names),
+        rel_paths_with_base_names(upstream_files_rel, cross_artifact_names),
         inet_dist_path,
         inet_files_rel,
     )
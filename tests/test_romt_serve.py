@@ -0,0 +1,57 @@
+import http.server
+import threading
+import typing as T
+from pathlib import Path
+
+import git
+import pytest
+
+from romt import serve
+
+
+@pytest.fixture
+def git_server_url(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> T.Generator[str, None, None]:
+    pytest.importorskip("dulwich")
+    app = serve.make_git_wsgi_app(tmp_path / "git")
+    assert app is not None
+    monkeypatch.setattr(serve.Handler, "_git_wsgi_app", app)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), serve.Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/git"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def commit_file(repo: git.Repo, name: str, text: str) -> str:
+    working_tree_dir = repo.working_tree_dir
+    assert working_tree_dir is not None
+    path = Path(working_tree_dir) / name
+    path.write_text(text, encoding="utf-8")
+    repo.index.add(str(path))
+    return repo.index.commit(f"add `{name}`").hexsha
+
+
+def test_git_wsgi_rejects_push(git_server_url: str, tmp_path: Path) -> None:
+    work_repo = git.Repo.init(str(tmp_path / "work"))
+    hexsha = commit_file(work_repo, "config.json", "{}\n")
+    bare_path = tmp_path / "git" / "idx.git"
+    bare_repo = git.Repo.clone_from(
+        str(tmp_path / "work"), str(bare_path), bare=True
+    )
+
+    # Fetching is served.
+    clone = git.Repo.clone_from(
+        f"{git_server_url}/idx.git", str(tmp_path / "clone")
+    )
+    assert clone.head.commit.hexsha == hexsha
+
+    # Pushing is refused and leaves the served repository unchanged.
+    commit_file(clone, "new.txt", "new\n")
+    with pytest.raises(git.GitCommandError):
+        clone.remote("origin").push(f"HEAD:{clone.active_branch.name}")
+    assert bare_repo.head.commit.hexsha == hexsha
@@ -18,6 +18,10 @@ def test_parse_select() -> None:
     assert parse("2020-04-01") == ("2020-04-01", "*")
     assert parse("latest") == ("latest", "*")
     assert parse("*") == ("*", "*")
+    # Results are cached, keyed by spec.
+    info = parse.cache_info()
+    assert parse("nightly-2020-04-01") == ("2020-04-01", "nightly")
+    assert parse.cache_info().hits == info.hits + 1
 
     with pytest.raises(error.UsageError):
         parse("nightly-")